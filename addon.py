@@ -4,6 +4,7 @@ import xbmc
 import xbmcgui
 import xbmcaddon
 
+from resources.lib import log
 from resources.lib.skinparse import get_preferred_font
 from resources.lib.photoframe import photoFrameAddon, CFG
 
@@ -50,6 +51,9 @@ __localize__ = ADDON.getLocalizedString
 CFG.PLAYLIST = ADDON.getSetting('playlist-name')
 CFG.PLAYLIST_EXT = 'm3u'
 
+# Configure the log before get_preferred_font(), which logs the selected font.
+log.configure(ADDONNAME, log.LEVELS[ADDON.getSetting('log-level')])
+
 # Choose a font for image captions (Exif UserComment).
 if ADDON.getSetting('font-req-style').lower() in ['true', '1']:
     CFG.REQUIRED_FONT_STYLE = ADDON.getSetting('font-style')
@@ -71,6 +75,12 @@ CFG.CAPTION_FONT_RATIO_XY = 0.37
 CFG.SLIDE_TIME_DEFAULT = float(ADDON.getSetting('slide-time'))
 CFG.SLIDE_TIME_MIN = 3.0
 CFG.SLIDE_TIME_MAX = 120.0
+# Seconds to wait before rendering again at best quality, when paused.
+CFG.REFINE_DELAY = 1.0
+
+# Check playlist and images for changes while the slideshow is running.
+CFG.LIVE_RELOAD = ADDON.getSetting('live-reload').lower() in ['true', '1']
+CFG.RELOAD_TIME = 10.0
 
 # Vertical position of caption, percent of image height.
 CFG.CAPTION_Y_POS_PERC = float(ADDON.getSetting('caption-position')) / 100.0
@@ -79,6 +89,12 @@ CFG.CAPTION_MAX_ROWS = int(ADDON.getSetting('caption-max-rows'))
 # Text color in AARRGGBB format.
 CFG.CAPTION_FG_COLOR = '0xffffff00'
 
+# Number of slides to profile with cProfile and tracemalloc (0 = disabled).
+CFG.PROFILE_SLIDES = int(ADDON.getSetting('profile-slides'))
+
+# Images bigger than this (in pixels) are loaded with bounded memory usage.
+CFG.LARGE_IMAGE_PIXELS = int(ADDON.getSetting('large-image-limit')) * 1000000
+
 
 #--------------------------------------------------------------------------
 # Addon entry point: get the Context Menu item path and run on that.
@@ -5,9 +5,8 @@ of a PIL image. UserComment is properly decoded by character
 set and bytes ordering.
 """
 
-import logging
-import xbmc
 from PIL import ExifTags
+from resources.lib import log
 
 __author__ = "Niccolo Rigacci"
 __copyright__ = "Copyright 2023 Niccolo Rigacci <niccolo@rigacci.org>"
@@ -15,13 +14,6 @@ __license__ = "GPLv3-or-later"
 __email__ = "niccolo@rigacci.org"
 __version__ = "0.1.0"
 
-def log_debug(string):
-    """ Emit some debug information  """
-    #logging.error(string)
-    #xbmc.log(msg=string, level=xbmc.LOGINFO)
-    pass
-
-
 def utf16_guess_decode(string, hint=None):
     """ Try to guess Little-Endian or Big-Endian bytes ordering """
     try:
@@ -44,10 +36,10 @@ def utf16_guess_decode(string, hint=None):
     else:
         guess = 'I'
     if guess == 'I':
-        log_debug('Guessed UTF-16 Little-Endian (Intel) bytes ordering')
+        log.debug('Guessed UTF-16 Little-Endian (Intel) bytes ordering')
         return lit_endian
     else:
-        log_debug('Guessed UTF-16 Big-Endian (Motorola) bytes ordering')
+        log.debug('Guessed UTF-16 Big-Endian (Motorola) bytes ordering')
         return big_endian
 
 
@@ -65,25 +57,25 @@ def decode_exif_usercomment(exif_tag):
     try:
         code_id = exif_tag[0:8].upper()
         content = exif_tag[8:]
-        log_debug('Exif code_id: %s' % (code_id,))
-        log_debug('Exif content: %s' % (content,))
+        log.debug('Exif code_id: %s', code_id)
+        log.debug('Exif content: %s', content)
     except:
         return None
     if code_id.startswith(b'ASCII'):
-        log_debug('UserComment char code: ITU-T T.50 IA5 (ASCII)')
+        log.debug('UserComment char code: ITU-T T.50 IA5 (ASCII)')
         user_comment = null_terminate(content).decode('ascii', 'ignore').rstrip()
     elif code_id.startswith(b'JIS'):
-        log_debug('UserComment char code: JIS X208-1990')
+        log.debug('UserComment char code: JIS X208-1990')
         user_comment = null_terminate(content).decode('shift_jis', 'ignore').rstrip()
     elif code_id.startswith(b'UNICODE'):
         # Unicode is UCS-2 (16bit) in Exif, guess the byte order.
-        log_debug('UserComment char code: Unicode')
+        log.debug('UserComment char code: Unicode')
         user_comment = utf16_guess_decode(content).rstrip()
     elif code_id.startswith(b'\0' * 8):
-        log_debug("UserComment char code: Undefined ('\\0' * 8); assuming UTF-8")
+        log.debug("UserComment char code: Undefined ('\\0' * 8); assuming UTF-8")
         user_comment = null_terminate(content).decode('utf-8', 'ignore').rstrip()
     else:
-        log_debug('UserComment char code: Unknown; assuming UTF-8')
+        log.debug('UserComment char code: Unknown; assuming UTF-8')
         user_comment = null_terminate(exif_tag).decode('utf-8', 'ignore').strip()
     if len(user_comment) == 0:
         user_comment = None
@@ -109,6 +101,5 @@ def get_exif_tags(image):
         if k in exif_data:
             tags['orientation'] = exif_data[k]
     except Exception as e:
-        exception_str = str(e)
-        log_debug('Error reading Exif data from file: %s' % (str(e),), )
+        log.debug('Error reading Exif data from file: %s', e)
     return tags
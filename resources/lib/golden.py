@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+Golden-output regression corpus for render.py. A deterministic set
+of synthetic images is rendered at known geometries (all the Exif
+orientations, black borders below and above the 0.7% fix threshold,
+letterbox and pillarbox, invalid geometries, broken files, high
+bit-depth and bounded memory loading) and compared against golden
+outputs, with per-case PSNR/SSIM tolerances. An optimized render
+path is accepted if it stays within the tolerances. The golden
+outputs of all the valid geometries are not made by render.py, but
+independently from the specification (ImageOps.exif_transpose(),
+crop and resize, black borders), so that a wrong rotation, crop,
+rounding or border fails also on a fresh checkout.
+
+Run from the add-on root directory, Kodi is not required:
+
+    python3 -m resources.lib.golden generate <directory>
+    python3 -m resources.lib.golden check <directory> [tier]
+
+Generate the golden outputs before changing the rendering code,
+then check after the change (optionally at a governor.py quality
+tier). Use the same Pillow build for both, JPEG decoders may differ.
+"""
+
+from PIL import Image, ImageChops, ImageDraw, ImageOps, ImageStat
+import io
+import json
+import math
+import os
+import os.path
+import sys
+
+from resources.lib import log
+from resources.lib.governor import QualityGovernor, TIER_DEFAULT
+from resources.lib.render import render_image, render_broken
+
+__author__ = "Niccolo Rigacci"
+__copyright__ = "Copyright 2026 Niccolo Rigacci <niccolo@rigacci.org>"
+__license__ = "GPLv3-or-later"
+__email__ = "niccolo@rigacci.org"
+__version__ = "0.1.0"
+
+ADDON_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BROKEN_PHOTO = os.path.join(ADDON_ROOT, 'resources', 'media', 'broken-photo.png')
+
+SCREEN = (320, 180)
+SOURCE = (480, 270)
+EXIF_ORIENTATION = 0x0112
+EXIF_USERCOMMENT = 0x9286
+# Black borders smaller than 0.7% of the image size are removed.
+BORDER_FIX = 0.007
+
+# Test cases: (name, source, geometry, max_pixels, reference, min_psnr, min_ssim).
+# The output is compared against the golden of reference (default: the case itself).
+# Changing the resample filter costs about 29 dB on the test pattern, while
+# a crop off by one pixel drops below 20 dB.
+CORPUS = [
+    ('fit',               'plain.jpg',  '480x270+0+0',   None,  None,          26.0, 0.90),
+    ('zoom',              'plain.jpg',  '240x135+100+60', None, None,          26.0, 0.90),
+    ('odd-crop',          'plain.jpg',  '241x135+99+61', None,  None,          26.0, 0.90),
+    ('border-x-small',    'plain.jpg',  '480x270+2+0',   None,  None,          26.0, 0.90),
+    ('border-x-large',    'plain.jpg',  '480x270+25+0',  None,  None,          26.0, 0.90),
+    ('border-y-small',    'plain.jpg',  '480x270+0+1',   None,  None,          26.0, 0.90),
+    ('border-y-large',    'plain.jpg',  '480x270+0+15',  None,  None,          26.0, 0.90),
+    ('letterbox',         'plain.jpg',  '480x320+0+0',   None,  None,          26.0, 0.90),
+    ('pillarbox',         'plain.jpg',  '560x270+0+0',   None,  None,          26.0, 0.90),
+    ('invalid-syntax',    'plain.jpg',  '480x270',       None,  None,          26.0, 0.90),
+    ('invalid-offset',    'plain.jpg',  '100x56+500+0',  None,  None,          26.0, 0.90),
+    ('broken-truncated',  'broken.jpg', '480x270+0+0',   None,  None,          26.0, 0.90),
+    ('broken-not-image',  'text.jpg',   '480x270+0+0',   None,  None,          26.0, 0.90),
+    ('zoom-gray',         'gray8.tif',  '240x135+120+60', None, None,          26.0, 0.90),
+    ('gray16',            'gray16.tif', '240x135+120+60', 20000, 'zoom-gray',  26.0, 0.90),
+    ('strips',            'strips.tif', '240x135+100+60', None, None,          26.0, 0.90),
+    ('strips-bounded',    'strips.tif', '240x135+100+60', 20000, 'strips',     26.0, 0.90),
+    ('jpeg-bounded',      'plain.jpg',  '480x270+0+0',   20000, 'fit',         26.0, 0.90),
+    # Downscaling by 4: JPEG draft decoding and band reduction.
+    ('large',             'large.tif',  '1280x720+0+0',  None,  None,          26.0, 0.90),
+    ('large-strips',      'large.tif',  '1280x720+0+0',  100000, 'large',      24.0, 0.85),
+    ('large-jpeg',        'large.jpg',  '1280x720+0+0',  100000, 'large',      24.0, 0.85),
+    ('large-draft',       'large.jpg',  '1280x720+0+0',  None,  'large',       24.0, 0.85),
+] + [
+    ('orientation-%d' % (o,), 'orientation-%d.jpg' % (o,), '160x90+30+50', None, None, 26.0, 0.90)
+    for o in range(1, 9)
+] + [
+    ('orientation-%d-bounded' % (o,), 'orientation-%d.jpg' % (o,), '160x90+30+50', 20000, 'orientation-%d' % (o,), 26.0, 0.90)
+    for o in range(1, 9)
+]
+
+# Cases whose golden output is made independently of render.py.
+INDEPENDENT = [
+    'fit', 'zoom', 'odd-crop', 'border-x-small', 'border-x-large', 'border-y-small',
+    'border-y-large', 'letterbox', 'pillarbox', 'zoom-gray', 'strips', 'large'
+] + ['orientation-%d' % (o,) for o in range(1, 9)]
+
+
+def make_pattern(size):
+    """ Return an RGB test pattern, asymmetric to reveal flips, rotations and offsets """
+    w, h = size
+    image = Image.new('RGB', size)
+    draw = ImageDraw.Draw(image)
+    for y in range(h):
+        for x in range(0, w, 4):
+            draw.rectangle((x, y, x + 3, y), fill=(x * 255 // w, y * 255 // h, 128))
+    for x in range(0, w, 16):
+        draw.line((x, 0, x, h - 1), fill=(0, 0, 0))
+    for y in range(0, h, 16):
+        draw.line((0, y, w - 1, y), fill=(0, 0, 0))
+    # One-pixel border and a marker in the top-left corner.
+    draw.rectangle((0, 0, w - 1, h - 1), outline=(255, 255, 255))
+    draw.rectangle((8, 8, w // 4, h // 4), fill=(255, 0, 0))
+    draw.rectangle((w // 4, 8, w // 4 + 16, h // 8), fill=(0, 255, 0))
+    return image
+
+
+def make_sources(directory):
+    """ Write the synthetic source images into directory """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    pattern = make_pattern(SOURCE)
+    exif = Image.Exif()
+    exif[EXIF_USERCOMMENT] = b'ASCII\0\0\0Golden corpus'
+    pattern.save(os.path.join(directory, 'plain.jpg'), quality=95, exif=exif)
+    for o in range(1, 9):
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = o
+        pattern.save(os.path.join(directory, 'orientation-%d.jpg' % (o,)), quality=95, exif=exif)
+    # Uncompressed TIFF with 16 rows per strip.
+    pattern.save(os.path.join(directory, 'strips.tif'), tiffinfo={278: 16})
+    large = make_pattern((SOURCE[0] * 8 // 3, SOURCE[1] * 8 // 3))
+    large.save(os.path.join(directory, 'large.tif'), tiffinfo={278: 16})
+    large.save(os.path.join(directory, 'large.jpg'), quality=95)
+    pattern.convert('L').save(os.path.join(directory, 'gray8.tif'), tiffinfo={278: 16})
+    gray = pattern.convert('L').convert('I').point(lambda v: v * 256).convert('I;16')
+    gray.save(os.path.join(directory, 'gray16.tif'), tiffinfo={278: 16})
+    with open(os.path.join(directory, 'plain.jpg'), 'rb') as f:
+        data = f.read()
+    with open(os.path.join(directory, 'broken.jpg'), 'wb') as f:
+        f.write(data[0:len(data) // 3])
+    with open(os.path.join(directory, 'text.jpg'), 'w') as f:
+        f.write('This is not an image.\n')
+
+
+def render_case(directory, case, tier):
+    """ Render a test case as the add-on does, return (image, status) """
+    name, source, geometry, max_pixels = case[0:4]
+    draft, resample, quality = QualityGovernor().params(tier)
+    try:
+        image, exif_tags, invalid_geometry = render_image(
+            os.path.join(directory, source), geometry, SCREEN, draft, resample, max_pixels)
+        status = {'broken': False, 'invalid': invalid_geometry, 'caption': exif_tags['usercomment']}
+    except Exception:
+        image = render_broken(BROKEN_PHOTO, SCREEN)
+        status = {'broken': True, 'invalid': False, 'caption': ''}
+        quality = 75
+    # Include the JPEG encoding of the cache file.
+    return jpeg_roundtrip(image, quality), status
+
+
+def jpeg_roundtrip(image, quality):
+    """ Return the image as it is read back from the JPEG cache file """
+    buf = io.BytesIO()
+    image.save(buf, format='JPEG', quality=quality)
+    buf.seek(0)
+    return Image.open(buf).convert('RGB')
+
+
+def expected_span(offset, length, size):
+    """ Return (offset, length, black) of the geometry along one axis, black is the total border """
+    excess = offset + length - size
+    if excess > 0 and float(excess) / size < BORDER_FIX:
+        # Small border: move the geometry inside the image.
+        offset -= excess
+        if offset < 0:
+            length += offset
+            offset = 0
+        excess = offset + length - size
+    return offset, length, max(0, excess)
+
+
+def expected_case(directory, case, tier):
+    """ Return the expected output of a valid geometry, without using render.py """
+    name, source, geometry = case[0:3]
+    draft, resample, quality = QualityGovernor().params(tier)
+    image = ImageOps.exif_transpose(Image.open(os.path.join(directory, source))).convert('RGB')
+    w, h, x, y = [int(v) for v in geometry.replace('x', '+').split('+')]
+    x, w, black_x = expected_span(x, w, image.width)
+    y, h, black_y = expected_span(y, h, image.height)
+    zoom_x = float(SCREEN[0]) / w
+    zoom_y = float(SCREEN[1]) / h
+    # The part of the geometry beyond the image is black, half on each side.
+    crop_w = w - black_x
+    crop_h = h - black_y
+    region = image.crop((x, y, x + crop_w, y + crop_h))
+    region = region.resize((int(crop_w * zoom_x), int(crop_h * zoom_y)), resample=resample)
+    output = Image.new('RGB', SCREEN)
+    output.paste(region, (int(black_x / 2.0 * zoom_x), int(black_y / 2.0 * zoom_y)))
+    return jpeg_roundtrip(output, quality)
+
+
+def psnr(a, b):
+    """ Peak signal-to-noise ratio (dB) between two RGB images """
+    rms = ImageStat.Stat(ImageChops.difference(a, b)).rms
+    mse = sum(r * r for r in rms) / len(rms)
+    if mse == 0:
+        return float('inf')
+    return 10.0 * math.log10(255.0 * 255.0 / mse)
+
+
+def ssim(a, b, block=8):
+    """ Mean structural similarity of the luminance, over block x block windows """
+    w, h = a.size
+    pa = a.convert('L').tobytes()
+    pb = b.convert('L').tobytes()
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    n = float(block * block)
+    total = 0.0
+    count = 0
+    for y in range(0, h - block + 1, block):
+        for x in range(0, w - block + 1, block):
+            xs = [pa[(y + j) * w + x + i] for j in range(block) for i in range(block)]
+            ys = [pb[(y + j) * w + x + i] for j in range(block) for i in range(block)]
+            mx = sum(xs) / n
+            my = sum(ys) / n
+            vx = sum((v - mx) ** 2 for v in xs) / n
+            vy = sum((v - my) ** 2 for v in ys) / n
+            cov = sum((xs[k] - mx) * (ys[k] - my) for k in range(len(xs))) / n
+            total += ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx * mx + my * my + c1) * (vx + vy + c2))
+            count += 1
+    return total / count
+
+
+def generate(directory, tier=TIER_DEFAULT):
+    """ Create the sources and the golden outputs into directory """
+    sources = os.path.join(directory, 'sources')
+    golden = os.path.join(directory, 'golden')
+    make_sources(sources)
+    if not os.path.isdir(golden):
+        os.makedirs(golden)
+    manifest = {}
+    for case in CORPUS:
+        if case[4] is not None:
+            continue
+        image, status = render_case(sources, case, tier)
+        if case[0] in INDEPENDENT:
+            image = expected_case(sources, case, tier)
+        image.save(os.path.join(golden, '%s.png' % (case[0],)))
+        manifest[case[0]] = status
+    with open(os.path.join(golden, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print('Generated %d golden outputs into "%s"' % (len(manifest), golden))
+
+
+def check(directory, tier=TIER_DEFAULT):
+    """ Compare the current rendering against the golden outputs, return failures count """
+    sources = os.path.join(directory, 'sources')
+    golden = os.path.join(directory, 'golden')
+    with open(os.path.join(golden, 'manifest.json')) as f:
+        manifest = json.load(f)
+    failures = 0
+    for name, source, geometry, max_pixels, reference, min_psnr, min_ssim in CORPUS:
+        reference = name if reference is None else reference
+        case = (name, source, geometry, max_pixels)
+        image, status = render_case(sources, case, tier)
+        expected = Image.open(os.path.join(golden, '%s.png' % (reference,))).convert('RGB')
+        errors = []
+        if status != manifest[reference]:
+            errors.append('status %s, expected %s' % (status, manifest[reference]))
+        if image.size != expected.size:
+            errors.append('size %dx%d, expected %dx%d' % (image.size + expected.size))
+            value_psnr, value_ssim = (0.0, 0.0)
+        else:
+            value_psnr = psnr(image, expected)
+            value_ssim = ssim(image, expected)
+            if value_psnr < min_psnr:
+                errors.append('PSNR below %0.1f dB' % (min_psnr,))
+            if value_ssim < min_ssim:
+                errors.append('SSIM below %0.3f' % (min_ssim,))
+        print('%-4s %-20s PSNR %6.1f dB  SSIM %0.4f  %s' % (
+            'FAIL' if errors else 'ok', name, min(value_psnr, 99.9), value_ssim, '; '.join(errors)))
+        if errors:
+            failures += 1
+    print('%d cases, %d failures' % (len(CORPUS), failures))
+    return failures
+
+
+if (__name__ == '__main__'):
+    if len(sys.argv) < 3 or sys.argv[1] not in ('generate', 'check'):
+        print('Usage: python3 -m resources.lib.golden generate|check <directory> [tier]')
+        sys.exit(2)
+    tier = int(sys.argv[3]) if len(sys.argv) > 3 else TIER_DEFAULT
+    # Invalid geometries and broken files are expected.
+    log.configure('golden', log.FATAL)
+    if sys.argv[1] == 'generate':
+        generate(sys.argv[2], tier)
+    else:
+        sys.exit(1 if check(sys.argv[2], tier) > 0 else 0)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Module to adapt the rendering quality to the device speed. Render
+times are measured against the slide deadline and the quality tier
+is stepped down when the slideshow risks to fall behind, and stepped
+up again when there is enough headroom.
+"""
+
+from PIL import Image
+
+__author__ = "Niccolo Rigacci"
+__copyright__ = "Copyright 2026 Niccolo Rigacci <niccolo@rigacci.org>"
+__license__ = "GPLv3-or-later"
+__email__ = "niccolo@rigacci.org"
+__version__ = "0.1.0"
+
+# Quality tiers, from best to fastest:
+# (name, JPEG draft decoding, resample filter, JPEG save quality).
+QUALITY_TIERS = (
+    ('best',   False, Image.LANCZOS,  90),
+    ('high',   False, Image.BILINEAR, 75),
+    ('medium', True,  Image.BILINEAR, 75),
+    ('low',    True,  Image.NEAREST,  60),
+)
+TIER_BEST = 0
+TIER_DEFAULT = 1
+
+
+class QualityGovernor:
+    """ Choose the best quality tier which still meets the slide deadline """
+
+    def __init__(self, tier=TIER_DEFAULT, budget=0.5, headroom=0.25, smoothing=0.3, patience=3):
+        # Fraction of the slide time which a render may take.
+        self.budget = budget
+        # Step up when renders take less than headroom * budget.
+        self.headroom = headroom
+        self.smoothing = smoothing
+        # Number of consecutive fast renders required to step up.
+        self.patience = patience
+        self.tier = tier
+        self.average = None
+        self.fast_count = 0
+
+    def name(self, tier=None):
+        """ Return the name of the tier (default: the current one) """
+        return QUALITY_TIERS[self.tier if tier is None else tier][0]
+
+    def params(self, tier=None):
+        """ Return (draft, resample, quality) of the tier (default: the current one) """
+        return QUALITY_TIERS[self.tier if tier is None else tier][1:4]
+
+    def update(self, elapsed, deadline):
+        """ Account a render time; return (old_tier, new_tier) on change, else None """
+        if self.average is None:
+            self.average = elapsed
+        else:
+            self.average = self.smoothing * elapsed + (1.0 - self.smoothing) * self.average
+        budget = deadline * self.budget
+        old_tier = self.tier
+        if self.average > budget:
+            self.fast_count = 0
+            if self.tier < len(QUALITY_TIERS) - 1:
+                self.tier += 1
+        elif self.average < budget * self.headroom:
+            self.fast_count += 1
+            if self.fast_count >= self.patience and self.tier > TIER_BEST:
+                self.tier -= 1
+        else:
+            self.fast_count = 0
+        if self.tier == old_tier:
+            return None
+        # Start measuring again at the new tier.
+        self.average = None
+        self.fast_count = 0
+        return (old_tier, self.tier)
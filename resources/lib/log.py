@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Module for low overhead logging. Messages are formatted only if
+they are actually emitted (arguments are passed separately, as
+with the standard logging module) and disabled levels cost just
+a comparison. Recent events are kept unformatted into a fixed-size
+ring buffer, which is dumped into the add-on profile directory
+on exit and shortly after an error (once for a burst of errors,
+by a background thread). The xbmc module is imported only when the
+first message is emitted, so this module can be imported also
+outside Kodi.
+"""
+
+from collections import deque
+import os
+import threading
+import time
+
+__author__ = "Niccolo Rigacci"
+__copyright__ = "Copyright 2026 Niccolo Rigacci <niccolo@rigacci.org>"
+__license__ = "GPLv3-or-later"
+__email__ = "niccolo@rigacci.org"
+__version__ = "0.1.0"
+
+# Same values as xbmc.LOGDEBUG ... xbmc.LOGFATAL (Kodi 19 and later).
+DEBUG = 0
+INFO = 1
+WARNING = 2
+ERROR = 3
+FATAL = 4
+
+LEVELS = {
+    'DEBUG':   DEBUG,
+    'INFO':    INFO,
+    'WARNING': WARNING,
+    'ERROR':   ERROR,
+    'FATAL':   FATAL
+}
+# Create the inverse dictionary, to search the label by value.
+LABELS = dict(zip(LEVELS.values(), LEVELS.keys()))
+
+RING_SIZE = 200
+# Seconds between an error and the dump, further errors are included.
+DUMP_DELAY = 5.0
+
+_prefix = ''
+_verbosity = WARNING
+_ring_level = INFO
+# Messages below this level are discarded without any work.
+_threshold = INFO
+_ring = deque([], RING_SIZE)
+_dump_dir = None
+_dump_timer = None
+_dump_lock = threading.Lock()
+session = time.strftime('%Y%m%d-%H%M%S')
+
+
+def configure(prefix, verbosity, dump_dir=None, ring_level=INFO, ring_size=RING_SIZE):
+    """ Set the messages prefix, the Kodi log verbosity and the ring buffer """
+    global _prefix, _verbosity, _ring_level, _threshold, _ring, _dump_dir
+    _prefix = prefix
+    _verbosity = verbosity
+    _ring_level = ring_level
+    _threshold = min(verbosity, ring_level)
+    if ring_size != _ring.maxlen:
+        _ring = deque(_ring, ring_size)
+    _dump_dir = dump_dir
+
+
+def enabled(level):
+    """ Return True if a message at level would be processed """
+    return level >= _threshold
+
+
+def log(level, msg, *args):
+    """ Log msg % args, formatting the message only if needed """
+    if level < _threshold:
+        return
+    if level >= _ring_level:
+        _ring.append((time.time(), level, msg, args))
+    if level >= _verbosity:
+        _emit(level, msg % args if args else msg)
+    if level >= ERROR:
+        _schedule_dump()
+
+
+def debug(msg, *args):
+    log(DEBUG, msg, *args)
+
+
+def info(msg, *args):
+    log(INFO, msg, *args)
+
+
+def warning(msg, *args):
+    log(WARNING, msg, *args)
+
+
+def error(msg, *args):
+    log(ERROR, msg, *args)
+
+
+def _emit(level, message):
+    """ Send a message to the Kodi log, always as LOGINFO (see photoframe.py) """
+    message = '%s: %7s: %s' % (_prefix, LABELS[level], message)
+    try:
+        import xbmc
+        xbmc.log(msg=message, level=xbmc.LOGINFO)
+    except ImportError:
+        import logging
+        logging.getLogger(_prefix).warning(message)
+
+
+def events():
+    """ Return the formatted events from the ring buffer, oldest first """
+    lines = []
+    for timestamp, level, msg, args in list(_ring):
+        try:
+            message = msg % args if args else msg
+        except Exception as e:
+            message = '%s %r (%s)' % (msg, args, str(e))
+        lines.append('%s.%03d %7s: %s' % (
+            time.strftime('%H:%M:%S', time.localtime(timestamp)),
+            int((timestamp % 1.0) * 1000), LABELS[level], message))
+    return lines
+
+
+def _schedule_dump():
+    """ Dump the ring buffer after DUMP_DELAY, unless a dump is already pending """
+    global _dump_timer
+    if _dump_dir is None:
+        return
+    with _dump_lock:
+        if _dump_timer is None:
+            _dump_timer = threading.Timer(DUMP_DELAY, dump)
+            _dump_timer.daemon = True
+            _dump_timer.start()
+
+
+def dump():
+    """ Write the ring buffer into the profile directory, return the file name """
+    global _dump_timer
+    with _dump_lock:
+        if _dump_timer is not None:
+            # Called on exit: the pending dump is done now.
+            _dump_timer.cancel()
+            _dump_timer = None
+    if _dump_dir is None:
+        return None
+    filename = os.path.join(_dump_dir, 'events-%s.log' % (session,))
+    try:
+        # See addon.py about .encode('utf-8') on paths.
+        if not os.path.isdir(_dump_dir.encode('utf-8')):
+            os.makedirs(_dump_dir.encode('utf-8'))
+        with open(filename.encode('utf-8'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(events()) + '\n')
+    except Exception as e:
+        _emit(ERROR, 'Cannot dump events into "%s": %s' % (filename, str(e)))
+        return None
+    return filename
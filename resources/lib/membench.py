@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the peak memory (resident set size) needed to render a
+large image, with the plain path (whole image decoded as RGB) and
+with the bounded path of largeimage.py. Synthetic sources are
+created in several formats; every measurement runs in a separate
+process, because the peak RSS cannot be reset (and on Linux it is
+inherited from the parent process, which must stay small). Linux and
+macOS only (it needs the resource module).
+
+Run from the add-on root directory, Kodi is not required:
+
+    python3 -m resources.lib.membench <directory> [megapixels]
+"""
+
+from PIL import Image, ImageDraw
+import os
+import os.path
+import resource
+import subprocess
+import sys
+
+from resources.lib.largeimage import load_region
+
+__author__ = "Niccolo Rigacci"
+__copyright__ = "Copyright 2026 Niccolo Rigacci <niccolo@rigacci.org>"
+__license__ = "GPLv3-or-later"
+__email__ = "niccolo@rigacci.org"
+__version__ = "0.1.0"
+
+ADDON_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCREEN = (1920, 1080)
+# Pixels limit passed to load_region().
+MAX_PIXELS = 4000000
+DEFAULT_MEGAPIXELS = 54
+
+# Sources: (filename, image mode, save() options).
+SOURCES = (
+    ('strips.tif',       'RGB',   {'tiffinfo': {278: 64}}),
+    ('lzw.tif',          'RGB',   {'compression': 'tiff_lzw'}),
+    ('gray16.tif',       'I;16',  {'tiffinfo': {278: 64}}),
+    ('gray16-lzw.tif',   'I;16',  {'compression': 'tiff_lzw'}),
+    ('plain.jpg',        'RGB',   {'quality': 90}),
+    ('plain.png',        'RGB',   {}),
+)
+
+
+def peak_rss():
+    """ Return the peak resident set size of this process, in KiB """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # Bytes on macOS, KiB on Linux.
+        peak //= 1024
+    return peak
+
+
+def make_sources(directory, megapixels):
+    """ Write the synthetic sources, if missing """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    h = int((megapixels * 1000000 / 1.5) ** 0.5)
+    size = (h * 3 // 2, h)
+    pattern = None
+    for filename, mode, options in SOURCES:
+        path = os.path.join(directory, filename)
+        if os.path.exists(path):
+            continue
+        if pattern is None:
+            pattern = Image.linear_gradient('L').resize(size)
+            pattern = Image.merge('RGB', (pattern, pattern.transpose(Image.ROTATE_180), pattern.transpose(Image.FLIP_LEFT_RIGHT)))
+            draw = ImageDraw.Draw(pattern)
+            for x in range(0, size[0], 64):
+                draw.line((x, 0, x, size[1] - 1), fill=(0, 0, 0))
+        if mode == 'I;16':
+            image = pattern.convert('L').convert('I').point(lambda v: v * 256).convert('I;16')
+        else:
+            image = pattern
+        image.save(path, **options)
+    return size
+
+
+def measure(mode, filename):
+    """ Render filename fullscreen with the plain or bounded path, return the peak RSS increase """
+    before = peak_rss()
+    # The sources are trusted, do not warn about decompression bombs.
+    Image.MAX_IMAGE_PIXELS = None
+    image = Image.open(filename)
+    size = image.size
+    if mode == 'plain':
+        image = image.convert('RGB').resize(SCREEN, resample=Image.BILINEAR)
+    else:
+        image.close()
+        image = load_region(filename, (0, 0, size[0], size[1]), 1, SCREEN, MAX_PIXELS)
+    return peak_rss() - before
+
+
+def child(*args):
+    """ Run this module with args in a new process, return its output or None on failure """
+    result = subprocess.run(
+        [sys.executable, '-m', 'resources.lib.membench'] + list(args),
+        cwd=ADDON_ROOT, stdout=subprocess.PIPE, universal_newlines=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def run(directory, megapixels):
+    """ Measure every source in a child process, print a report """
+    print('Sources %s, output %dx%d, max_pixels %d' % ((child('--sources', directory, str(megapixels)),) + SCREEN + (MAX_PIXELS,)))
+    print('%-16s %12s %12s' % ('Source', 'Plain MiB', 'Bounded MiB'))
+    for filename, mode, options in SOURCES:
+        path = os.path.join(directory, filename)
+        result = []
+        for path_mode in ('plain', 'bounded'):
+            output = child('--measure', path_mode, path)
+            result.append(int(output) / 1024.0 if output is not None else float('nan'))
+        print('%-16s %12.1f %12.1f' % (filename, result[0], result[1]))
+
+
+if (__name__ == '__main__'):
+    if len(sys.argv) == 4 and sys.argv[1] == '--measure':
+        print(measure(sys.argv[2], sys.argv[3]))
+    elif len(sys.argv) == 4 and sys.argv[1] == '--sources':
+        print('%dx%d' % make_sources(sys.argv[2], int(sys.argv[3])))
+    elif len(sys.argv) in (2, 3):
+        run(sys.argv[1], int(sys.argv[2]) if len(sys.argv) == 3 else DEFAULT_MEGAPIXELS)
+    else:
+        print('Usage: python3 -m resources.lib.membench <directory> [megapixels]')
+        sys.exit(2)
@@ -3,18 +3,21 @@
 import xbmc
 import xbmcgui
 import xbmcaddon
+import xbmcvfs
 
-from resources.lib.exif import get_exif_tags
+from resources.lib import log
+from resources.lib.render import render_image, render_broken
+from resources.lib.governor import QualityGovernor, TIER_BEST
+from resources.lib.profiler import SlideProfiler
 
-from PIL import Image, ExifTags
 from collections import deque
 import json
 import hashlib
 import os
 import os.path
-import re
 import threading
 import tempfile
+import time
 
 __author__ = "Niccolo Rigacci"
 __copyright__ = "Copyright 2019-2023 Niccolo Rigacci <niccolo@rigacci.org>"
@@ -36,7 +39,6 @@ ADDONNAME = ADDON.getAddonInfo('name')
 ADDONPATH = ADDON.getAddonInfo('path')
 __localize__ = ADDON.getLocalizedString
 
-GEOMETRY_RE = '(\d+)x(\d+)\+(\d+)\+(\d+)'
 FRAME_RATIOS = ('24x9', '16x9', '3x2', '4x3')
 
 # See https://codedocs.xyz/w3tech/xodi/group__python__xbmcgui__control__label.html
@@ -47,12 +49,11 @@ XBFONT_CENTER_Y   = 0x00000004
 XBFONT_TRUNCATED  = 0x00000008
 XBFONT_JUSTIFIED  = 0x00000010
 
-# Rotation needed (as per PIL) upon Exif orientation.
-EXIF_ROTATE = {
-    3: Image.ROTATE_180,
-    6: Image.ROTATE_270,
-    8: Image.ROTATE_90
-}
+# Color diffuse (AARRGGBB) of the shown and of the hidden image control.
+# Controls hidden with setVisible(False) do not load their texture, so
+# the hidden buffer is kept visible but fully transparent.
+DIFFUSE_SHOWN  = '0xFFFFFFFF'
+DIFFUSE_HIDDEN = '0x00FFFFFF'
 
 # Images.
 BROKEN_PHOTO = 'resources/media/broken-photo.png'
@@ -81,17 +82,9 @@ ACTION_SHOW_INFO = 11        # Key "i"
 #--------------------------------------------------------------------------
 # Kodi default is to emit messages with level >= xbmc.LOGNOTICE, this is
 # fixed and can be changed only in userdata/advancedsettings.xml.
-# So we make our own configurable logging verbosity.
+# So we make our own configurable logging verbosity (see log.py).
 #--------------------------------------------------------------------------
-LOG_LEVEL = {
-    'DEBUG':   xbmc.LOGDEBUG,
-    'INFO':    xbmc.LOGINFO,
-    'WARNING': xbmc.LOGWARNING,
-    'ERROR':   xbmc.LOGERROR,
-    'FATAL':   xbmc.LOGFATAL
-}
-# Create the inverse dictionary, to search the label by value.
-LOG_LABEL = dict(zip(LOG_LEVEL.values(), LOG_LEVEL.keys()))
+LOG_LEVEL = log.LEVELS
 
 
 
@@ -101,9 +94,13 @@ LOG_LABEL = dict(zip(LOG_LEVEL.values(), LOG_LEVEL.keys()))
 class photoFrameAddon(xbmcgui.Window):
 
     def initSlideshow(self, directory, playlist=None):
-        self.verbosity = LOG_LEVEL[ADDON.getSetting('log-level')]
-        self.myLog('initSlideshow(%s, %s)' % (directory, playlist), xbmc.LOGINFO)
-        self.myLog('Calling built-in InhibitScreensaver(true)', xbmc.LOGINFO)
+        profile = xbmcvfs.translatePath(ADDON.getAddonInfo('profile'))
+        log.configure(ADDONNAME, LOG_LEVEL[ADDON.getSetting('log-level')], profile)
+        self.profiler = None
+        if CFG.PROFILE_SLIDES > 0:
+            self.profiler = SlideProfiler(CFG.PROFILE_SLIDES, profile, log.session)
+        log.info('initSlideshow(%s, %s)', directory, playlist)
+        log.info('Calling built-in InhibitScreensaver(true)')
         xbmc.executebuiltin('InhibitScreensaver(true)')
         self.directory = directory
         self.slide_time = CFG.SLIDE_TIME_DEFAULT
@@ -114,6 +111,10 @@ class photoFrameAddon(xbmcgui.Window):
         self.geometry = {}
         self.cache = {}
         self.cache_caption = {}
+        self.cache_mtime = {}
+        self.cache_tier = {}
+        self.governor = QualityGovernor()
+        self.refine_timer = None
 
         # WARNING: API v17 has a bug: getWidth() and getHeight() actually return
         # the display resolution, which is not the same as the Window instance size.
@@ -127,7 +128,7 @@ class photoFrameAddon(xbmcgui.Window):
         # With Kodi 19 Matrix self.getWidth() and self.getHeight() are OK.
         self.img_w = self.getWidth()
         self.img_h = self.getHeight()
-        self.myLog('Window: %dx%d, image: %dx%d' % (self.getWidth(), self.getHeight(), self.img_w, self.img_h), xbmc.LOGINFO)
+        log.info('Window: %dx%d, image: %dx%d', self.getWidth(), self.getHeight(), self.img_w, self.img_h)
 
         if ADDON.getSetting('playlist-suffix').lower() == 'auto':
             # Search the best preset to match the window ratio.
@@ -139,13 +140,21 @@ class photoFrameAddon(xbmcgui.Window):
                 if abs(preset_ratio - window_ratio) < min_diff:
                     min_diff = abs(preset_ratio - window_ratio)
                     self.frame_ratio = preset
-            self.myLog('Best frame ratio selected: %s' % (self.frame_ratio,), xbmc.LOGINFO)
+            log.info('Best frame ratio selected: %s', self.frame_ratio)
         else:
             self.frame_ratio = ADDON.getSetting('playlist-suffix')
-            self.myLog('Frame ratio from settings: %s' % (self.frame_ratio,), xbmc.LOGINFO)
-
-        self.image = xbmcgui.ControlImage(0, 0, self.img_w, self.img_h, os.path.join(ADDONPATH, BLACK_SQUARE))
-        self.addControl(self.image)
+            log.info('Frame ratio from settings: %s', self.frame_ratio)
+
+        # Double buffer: the front image is shown, the back one is preloaded with the next slide.
+        self.images = []
+        for diffuse in (DIFFUSE_SHOWN, DIFFUSE_HIDDEN):
+            image = xbmcgui.ControlImage(0, 0, self.img_w, self.img_h, os.path.join(ADDONPATH, BLACK_SQUARE), colorDiffuse=diffuse)
+            self.addControl(image)
+            self.images.append(image)
+        self.front = 0
+        # For each image control: the file loaded and (caption layout, show_caption).
+        self.buffer_file = [None, None]
+        self.buffer_layout = [(None, None), (None, None)]
         caption_x = 0
         caption_w = self.img_w
         caption_h = int(CFG.CAPTION_FONT_SIZE * CFG.CAPTION_MAX_ROWS)
@@ -158,19 +167,14 @@ class photoFrameAddon(xbmcgui.Window):
         self.imageCaption = xbmcgui.ControlLabel(caption_x, caption_y, caption_w, caption_h, '', font=CFG.CAPTION_FONT, textColor=CFG.CAPTION_FG_COLOR, alignment=caption_alignment)
         self.addControl(self.imageCaption)
         self.getSlideList(self.directory, playlist, self.frame_ratio)
-        self.timer = threading.Timer(self.slide_time, self.nextSlide)
+        self.timer = threading.Timer(self.slide_time, self.nextSlide, (1, True))
         self.autoPlayStatus = True
         self.mutex = threading.Lock()
+        self.running = True
         self.cachePrepare()
         self.slides.rotate(1)
         self.nextSlide()
-
-
-    def myLog(self, msg, level):
-        """ Log to Kodi with xbmc.LOGINFO, but using our own verbosity """
-        if level >= self.verbosity:
-            message = '%s: %7s: %s' % (ADDONNAME, LOG_LABEL[level], msg)
-            xbmc.log(msg=message, level=xbmc.LOGINFO)
+        self.reloadTimerStart()
 
 
     def filenameHash(self, string):
@@ -187,6 +191,16 @@ class photoFrameAddon(xbmcgui.Window):
             self.cache_caption[key] = None
 
 
+    def cacheInvalidate(self, img):
+        """ Mark the cached image as stale, its temporary file will be recycled """
+        if img in self.cache:
+            key = self.filenameHash('stale-%s' % (self.cache[img],))
+            self.cache[key] = self.cache.pop(img)
+            self.cache_caption[key] = self.cache_caption.pop(img)
+            self.cache_mtime.pop(img, None)
+            self.cache_tier.pop(img, None)
+
+
     def cacheRemove(self):
         """ Remove temporary files """
         for i in self.cache:
@@ -207,6 +221,31 @@ class photoFrameAddon(xbmcgui.Window):
                 playlist = p2
         else:
             playlist = os.path.join(directory, playlist)
+        self.playlist = playlist
+        self.playlist_stat = self.playlistStat()
+        entries, exception_str = self.readPlaylist(playlist)
+        for img_hash, img_name, img_geometry in entries:
+            self.slides.append(img_hash)
+            self.filename[img_hash] = img_name
+            self.geometry[img_hash] = img_geometry
+        log.info('Playlist "%s" contains %d slides', playlist, len(self.slides))
+
+        if len(self.slides) < 1:
+            # Warning message if playlist is empty.
+            heading = __localize__(32004)
+            message = __localize__(32005)
+            if exception_str is not None:
+                message = '%s %s' % (message, exception_str)
+            xbmcgui.Dialog().notification(heading, message, xbmcgui.NOTIFICATION_WARNING)
+        elif exception_str is not None:
+            # Warning message if some entries are bad.
+            heading = __localize__(32006)
+            message = exception_str
+            xbmcgui.Dialog().notification(heading, message, xbmcgui.NOTIFICATION_WARNING)
+
+
+    def readPlaylist(self, playlist):
+        """ Parse the playlist, return a list of (hash, filename, geometry) and the last error """
         # Try to read the playlist file.
         try:
             exception_str = None
@@ -214,9 +253,10 @@ class photoFrameAddon(xbmcgui.Window):
                 slides_list = f.readlines()
         except Exception as e:
             exception_str = str(e)
-            self.myLog('Error reading playlist "%s": %s' % (playlist, str(e)), xbmc.LOGERROR)
+            log.error('Error reading playlist "%s": %s', playlist, str(e))
             slides_list = []
         # Parse all the lines from playlist.
+        entries = []
         for line in slides_list:
             line = line.strip()
             if line == '' or line.startswith('#'): continue
@@ -224,36 +264,123 @@ class photoFrameAddon(xbmcgui.Window):
             try:
                 img_name, img_geometry = line.split('|')
                 if img_geometry == '': continue
-                img_hash = self.filenameHash(img_name)
-                self.slides.append(img_hash)
-                self.filename[img_hash] = img_name
-                self.geometry[img_hash] = img_geometry
+                entries.append((self.filenameHash(img_name), img_name, img_geometry))
             except:
                 exception_str = __localize__(32020)
-        self.myLog('Playlist "%s" contains %d slides' % (playlist, len(self.slides)), xbmc.LOGINFO)
+        return entries, exception_str
 
-        if len(self.slides) < 1:
-            # Warning message if playlist is empty.
-            heading = __localize__(32004)
-            message = __localize__(32005)
-            if exception_str is not None:
-                message = '%s %s' % (message, exception_str)
-            xbmcgui.Dialog().notification(heading, message, xbmcgui.NOTIFICATION_WARNING)
-        elif exception_str is not None:
-            # Warning message if some entries are bad.
+
+    def playlistStat(self):
+        """ Return (mtime, size) of the playlist file, None if it is missing """
+        try:
+            st = os.stat(self.playlist.encode('utf-8'))
+            return (st.st_mtime, st.st_size)
+        except OSError:
+            return None
+
+
+    def sourceMtime(self, img):
+        """ Return the modification time of the source image, None if it is missing """
+        try:
+            return os.stat(os.path.join(self.directory, self.filename[img]).encode('utf-8')).st_mtime
+        except OSError:
+            return None
+
+
+    def reloadTimerStart(self):
+        """ Schedule the next check for playlist and images changes """
+        if CFG.LIVE_RELOAD and self.running:
+            timer = threading.Timer(CFG.RELOAD_TIME, self.reloadCheck)
+            timer.daemon = True
+            timer.start()
+            # Assigned after start(), reloadTimerStop() may join() it.
+            self.reload_timer = timer
+
+
+    def reloadTimerStop(self):
+        """ Cancel the reload timer and wait for a running reloadCheck() to finish """
+        timer = self.reload_timer
+        while True:
+            timer.cancel()
+            timer.join()
+            # A running check may have scheduled the next one meanwhile.
+            if self.reload_timer is timer:
+                break
+            timer = self.reload_timer
+
+
+    def reloadCheck(self):
+        """ Poll the playlist and the cached images, patch the slideshow if changed """
+        # Do not wait for the mutex: if a slide is changing, retry later.
+        if self.mutex.acquire(False):
+            cur_img = self.slides[0] if len(self.slides) > 0 else None
+            stale = set()
+            stat = self.playlistStat()
+            if stat is not None and stat != self.playlist_stat:
+                self.playlist_stat = stat
+                stale |= self.reloadPlaylist()
+            for img in list(self.cache_mtime):
+                if self.sourceMtime(img) != self.cache_mtime[img]:
+                    log.info('Image "%s" changed on disk', self.filename[img])
+                    stale.add(img)
+            for img in stale:
+                self.cacheInvalidate(img)
+            redisplay = len(self.slides) > 0 and (cur_img in stale or self.slides[0] != cur_img)
+            self.mutex.release()
+            if redisplay and self.running:
+                # Show again the current slide (or the one replacing it).
+                self.timer.cancel()
+                self.nextSlide(0)
+        self.reloadTimerStart()
+
+
+    def reloadPlaylist(self):
+        """ Patch slides[], filename{} and geometry{} in place, return the stale slides """
+        entries, exception_str = self.readPlaylist(self.playlist)
+        if len(entries) < 1:
+            # Maybe the file is being written right now, wait for a valid one.
+            log.warning('Reloaded playlist "%s" is empty, ignored', self.playlist)
+            self.playlist_stat = None
+            return set()
+        old_order = list(self.slides)
+        new_order = [entry[0] for entry in entries]
+        old_set = set(old_order)
+        new_set = set(new_order)
+        added = new_set - old_set
+        removed = old_set - new_set
+        stale = set()
+        for img_hash, img_name, img_geometry in entries:
+            if img_hash in old_set and self.geometry[img_hash] != img_geometry:
+                stale.add(img_hash)
+            self.filename[img_hash] = img_name
+            self.geometry[img_hash] = img_geometry
+        reordered = [i for i in old_order if i in new_set] != [i for i in new_order if i in old_set]
+        # Keep the current position: the current slide or the first following one still in playlist.
+        position = 0
+        for img in old_order:
+            if img in new_set:
+                position = new_order.index(img)
+                break
+        self.slides.clear()
+        self.slides.extend(new_order)
+        self.slides.rotate(-position)
+        log.info('Playlist "%s" reloaded: %d added, %d removed, %d geometries changed, reordered: %s',
+            self.playlist, len(added), len(removed), len(stale), reordered)
+        if exception_str is not None:
             heading = __localize__(32006)
-            message = exception_str
-            xbmcgui.Dialog().notification(heading, message, xbmcgui.NOTIFICATION_WARNING)
+            xbmcgui.Dialog().notification(heading, exception_str, xbmcgui.NOTIFICATION_WARNING)
+        return stale | removed
 
 
     def prepareCachedImage(self, img, cache_keep):
         """ Return the name of a temporary file, with the image cropped/resized """
-        self.myLog('Keep cache for %s, %s, %s' % (
-            self.filename[cache_keep[0]],
-            self.filename[cache_keep[1]],
-            self.filename[cache_keep[2]]), xbmc.LOGDEBUG)
+        if log.enabled(log.DEBUG):
+            log.debug('Keep cache for %s, %s, %s',
+                self.filename[cache_keep[0]],
+                self.filename[cache_keep[1]],
+                self.filename[cache_keep[2]])
         if img in self.cache:
-            self.myLog('Cache hit for %s in %s' % (self.filename[img], self.cache[img]), xbmc.LOGDEBUG)
+            log.debug('Cache hit for %s in %s', self.filename[img], self.cache[img])
         else:
             for i in self.cache:
                 if i not in cache_keep:
@@ -261,18 +388,109 @@ class photoFrameAddon(xbmcgui.Window):
                     os.remove(self.cache[i])
                     del self.cache[i]
                     del self.cache_caption[i]
+                    self.cache_mtime.pop(i, None)
+                    self.cache_tier.pop(i, None)
                     t = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
                     self.cache[img] = t.name
                     break
-            self.myLog('Cache miss for %s, creating %s' % (self.filename[img], self.cache[img]), xbmc.LOGDEBUG)
-            self.imageToGeometry(img, self.cache[img])
+            log.debug('Cache miss for %s, creating %s', self.filename[img], self.cache[img])
+            tier = self.governor.tier
+            start = time.time()
+            self.imageToGeometry(img, self.cache[img], tier)
+            elapsed = time.time() - start
+            self.cache_tier[img] = tier
+            log.debug('Image %s rendered in %0.3f s, quality tier "%s"', self.filename[img], elapsed, self.governor.name(tier))
+            change = self.governor.update(elapsed, self.slide_time)
+            if change is not None:
+                log.info('Quality tier changed from "%s" to "%s": last render time %0.3f s, slide time %0.1f s',
+                    self.governor.name(change[0]), self.governor.name(change[1]), elapsed, self.slide_time)
         return self.cache[img]
 
 
-    def nextSlide(self, direction=1):
-        """Move to the next slide (direction = 1) or previous one (-1) """
+    def refineTimerStart(self):
+        """ Schedule a best quality rendering of the current slide, if paused """
+        if self.refine_timer is not None:
+            self.refine_timer.cancel()
+        if not self.autoPlayStatus and self.running:
+            self.refine_timer = threading.Timer(CFG.REFINE_DELAY, self.refineSlide)
+            self.refine_timer.daemon = True
+            self.refine_timer.start()
+
+
+    def refineSlide(self):
+        """ Render again the current slide at best quality, while the show is paused """
+        # Read the slide under the mutex, render outside of it, so that
+        # user actions are not dropped; the shared state is updated only
+        # if the slide is still the same when done.
+        if not self.mutex.acquire(False):
+            # A slide is changing: try again later.
+            self.refineTimerStart()
+            return
+        img = self.slides[0] if len(self.slides) > 0 else None
+        refine = (img is not None and self.running and not self.autoPlayStatus and
+                  img in self.cache and self.cache_tier.get(img, TIER_BEST) != TIER_BEST)
+        if refine:
+            filename = os.path.join(self.directory, self.filename[img])
+            geometry = self.geometry[img]
+            mtime = self.sourceMtime(img)
+        self.mutex.release()
+        if not refine:
+            return
+        draft, resample, quality = self.governor.params(TIER_BEST)
+        t = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
+        try:
+            fullscreen_image, exif_tags, invalid_geometry = render_image(
+                filename, geometry, (self.img_w, self.img_h),
+                draft, resample, CFG.LARGE_IMAGE_PIXELS)
+            fullscreen_image.save(t.name, quality=quality)
+        except Exception as e:
+            # The error was already notified when the slide was shown.
+            log.warning('Cannot render "%s" at best quality: %s', filename, str(e))
+            os.remove(t.name)
+            return
+        # Wait for the mutex, the render would be lost otherwise.
+        with self.mutex:
+            if (self.running and not self.autoPlayStatus and len(self.slides) > 0 and
+                    self.slides[0] == img and img in self.cache and self.geometry[img] == geometry):
+                log.info('Image %s rendered again at best quality', self.filename[img])
+                os.remove(self.cache[img])
+                self.cache[img] = t.name
+                self.cache_caption[img] = exif_tags['usercomment']
+                self.cache_mtime[img] = mtime
+                self.cache_tier[img] = TIER_BEST
+                self.images[self.front].setImage(t.name, False)
+                self.buffer_file[self.front] = t.name
+                layout = self.captionLayout(img)
+                self.applyCaptionLayout(layout)
+                self.buffer_layout[self.front] = (layout, self.show_caption)
+                t = None
+        if t is not None:
+            os.remove(t.name)
+
+
+    def profilerDone(self):
+        """ Drop the profiler after its report, do not profile again at the next launch """
+        self.profiler = None
+        ADDON.setSetting('profile-slides', '0')
+
+
+    def slideTimerStart(self):
+        """ Schedule the next slide of the autoplay """
+        self.timer = threading.Timer(self.slide_time, self.nextSlide, (1, True))
+        self.timer.start()
+
+
+    def nextSlide(self, direction=1, timed=False):
+        """Move to the next slide (direction = 1) or previous one (-1), timed is True for the slide timer """
         if len(self.slides) < 1: return
-        if self.mutex.acquire(False):
+        # The slide timer waits for the mutex, otherwise the autoplay would stop.
+        if self.mutex.acquire(timed):
+            # Ignore ticks of a timer replaced or cancelled while waiting.
+            if not self.running or (timed and (not self.autoPlayStatus or threading.current_thread() is not self.timer)):
+                self.mutex.release()
+                return
+            if self.profiler is not None:
+                self.profiler.start()
             self.slides.rotate(-direction)
             cur_img = self.slides[0]
             self.slides.rotate(-1)
@@ -283,19 +501,58 @@ class photoFrameAddon(xbmcgui.Window):
             keep_cached = (prev_img, cur_img, next_img)
             # Prepare current image and show it.
             tmp = self.prepareCachedImage(cur_img, keep_cached)
-            self.updateImageCaption()
-            self.myLog('nextSlide(): Image %s from %s' % (self.filename[cur_img], tmp), xbmc.LOGINFO)
-            # WARNING: ControlImage.setImage() useCache=False parameter does not work.
-            # The prepareCachedImage() creates a new name each time, as a workaround.
-            self.image.setImage(tmp, False)
+            log.info('nextSlide(): Image %s from %s', self.filename[cur_img], tmp)
+            self.flipBuffers(cur_img, tmp)
             self.show()
             if self.autoPlayStatus:
-                self.timer = threading.Timer(self.slide_time, self.nextSlide)
-                self.timer.start()
+                self.slideTimerStart()
             # Prepare next and previous images in cache.
             self.prepareCachedImage(next_img, keep_cached)
             self.prepareCachedImage(prev_img, keep_cached)
+            # Preload the hidden image control with the slide coming next.
+            self.preloadBuffer(prev_img if direction < 0 else next_img)
+            if self.profiler is not None and self.profiler.stop():
+                self.profilerDone()
             self.mutex.release()
+            # After the release: the refine must not find the mutex busy.
+            self.refineTimerStart()
+
+
+    def flipBuffers(self, img, tmp):
+        """ Show the image file tmp by swapping the front and back image controls """
+        back = 1 - self.front
+        start = time.time()
+        preloaded = self.buffer_file[back] == tmp
+        if not preloaded:
+            # WARNING: ControlImage.setImage() useCache=False parameter does not work.
+            # The prepareCachedImage() creates a new name each time, as a workaround.
+            self.images[back].setImage(tmp, False)
+            self.buffer_file[back] = tmp
+        if preloaded and self.buffer_layout[back][1] == self.show_caption:
+            layout = self.buffer_layout[back][0]
+        else:
+            layout = self.captionLayout(img)
+            self.buffer_layout[back] = (layout, self.show_caption)
+        self.images[back].setColorDiffuse(DIFFUSE_SHOWN)
+        self.images[self.front].setColorDiffuse(DIFFUSE_HIDDEN)
+        self.applyCaptionLayout(layout)
+        self.front = back
+        # Kodi does not tell when the frame is actually rendered: this is the
+        # time spent until the controls are updated.
+        log.debug('Slide switch in %0.1f ms, preloaded: %s', (time.time() - start) * 1000.0, preloaded)
+
+
+    def preloadBuffer(self, img):
+        """ Load the cached image into the back image control, compute its caption layout """
+        tmp = self.cache.get(img)
+        back = 1 - self.front
+        if tmp is None:
+            return
+        if self.buffer_file[back] != tmp:
+            self.images[back].setImage(tmp, False)
+            self.buffer_file[back] = tmp
+        # Also if the file was already loaded, the stored layout may be of another slide.
+        self.buffer_layout[back] = (self.captionLayout(img), self.show_caption)
 
 
     def setAutoPlay(self, autoPlayEnabled):
@@ -304,40 +561,53 @@ class photoFrameAddon(xbmcgui.Window):
         heading = __localize__(32007)
         if autoPlayEnabled:
             xbmc.executebuiltin('InhibitScreensaver(true)')
-            self.timer = threading.Timer(self.slide_time, self.nextSlide)
-            self.timer.start()
             self.autoPlayStatus = True
+            self.slideTimerStart()
             message = __localize__(32008)
         else:
             xbmc.executebuiltin('InhibitScreensaver(false)')
             self.timer.cancel()
             self.autoPlayStatus = False
+            self.refineTimerStart()
             message = __localize__(32009)
-        self.myLog('setAutoPlay(): %s' % (message,), xbmc.LOGINFO)
+        log.info('setAutoPlay(): %s', message)
         xbmcgui.Dialog().notification(heading, message, xbmcgui.NOTIFICATION_INFO)
 
 
     def onAction(self, action):
         actionId = action.getId()
-        self.myLog('onAction(): action = %s' % (actionId,), xbmc.LOGDEBUG)
+        log.debug('onAction(): action = %s', actionId)
         if actionId == ACTION_PREVIOUS_MENU or actionId == ACTION_NAV_BACK or actionId == ACTION_STOP:
             # Keyboard Esc, Backspace or "x".
-            self.myLog('onAction(): ACTION_PREVIOUS_MENU or ACTION_NAV_BACK or ACTION_STOP', xbmc.LOGINFO)
+            log.info('onAction(): ACTION_PREVIOUS_MENU or ACTION_NAV_BACK or ACTION_STOP')
+            self.running = False
             self.timer.cancel()
-            self.cacheRemove()
-            self.myLog('Calling built-in InhibitScreensaver(false)', xbmc.LOGINFO)
+            if self.refine_timer is not None:
+                self.refine_timer.cancel()
+            if CFG.LIVE_RELOAD:
+                self.reloadTimerStop()
+            # Wait for a slide being rendered, before removing the cache.
+            with self.mutex:
+                self.timer.cancel()
+                self.cacheRemove()
+                if self.profiler is not None:
+                    # Exit before all the slides were profiled.
+                    self.profiler.write()
+                    self.profilerDone()
+            log.info('Calling built-in InhibitScreensaver(false)')
             xbmc.executebuiltin('InhibitScreensaver(false)')
+            log.dump()
             self.close()
         if actionId == ACTION_MOVE_RIGHT or actionId == ACTION_NEXT_PICTURE:
-            self.myLog('onAction(): ACTION_MOVE_RIGHT or ACTION_NEXT_PICTURE', xbmc.LOGINFO)
+            log.info('onAction(): ACTION_MOVE_RIGHT or ACTION_NEXT_PICTURE')
             self.setAutoPlay(False)
             self.nextSlide()
         if actionId == ACTION_MOVE_LEFT or actionId == ACTION_PREV_PICTURE:
-            self.myLog('onAction(): ACTION_MOVE_LEFT or ACTION_PREV_PICTURE', xbmc.LOGINFO)
+            log.info('onAction(): ACTION_MOVE_LEFT or ACTION_PREV_PICTURE')
             self.setAutoPlay(False)
             self.nextSlide(-1)
         if actionId == ACTION_PAUSE or actionId == ACTION_SELECT_ITEM:
-            self.myLog('onAction(): ACTION_PAUSE or ACTION_SELECT_ITEM', xbmc.LOGINFO)
+            log.info('onAction(): ACTION_PAUSE or ACTION_SELECT_ITEM')
             self.setAutoPlay(not self.autoPlayStatus)
         #if actionId == ACTION_CONTEXT_MENU or actionId == ACTION_SHOW_INFO:
         #    # Gamepad button "X", keyboard "c", keyboard "i".
@@ -351,10 +621,10 @@ class photoFrameAddon(xbmcgui.Window):
                 message = __localize__(32023)
             else:
                 message = __localize__(32024)
-            self.myLog('onAction(): %s' % (message,), xbmc.LOGINFO)
+            log.info('onAction(): %s', message)
             xbmcgui.Dialog().notification(heading, message, xbmcgui.NOTIFICATION_INFO)
         if actionId == ACTION_MOVE_UP or actionId == ACTION_MOVE_DOWN:
-            self.myLog('onAction(): ACTION_MOVE_UP or ACTION_MOVE_DOWN', xbmc.LOGINFO)
+            log.info('onAction(): ACTION_MOVE_UP or ACTION_MOVE_DOWN')
             if actionId == ACTION_MOVE_UP:
                 self.slide_time += 1.0
             if actionId == ACTION_MOVE_DOWN:
@@ -366,150 +636,82 @@ class photoFrameAddon(xbmcgui.Window):
             else:
                 heading = __localize__(32010)
                 message = __localize__(32011) % (int(self.slide_time),)
-                self.myLog('onAction(): %s' % (message,), xbmc.LOGINFO)
+                log.info('onAction(): %s', message)
                 xbmcgui.Dialog().notification(heading, message, xbmcgui.NOTIFICATION_INFO)
 
 
     def updateImageCaption(self):
         """ Update the image caption content, position and visibility """
-        cur_img = self.slides[0]
+        self.applyCaptionLayout(self.captionLayout(self.slides[0]))
+
+
+    def captionLayout(self, img):
+        """ Return (caption, y, height, background x, background width) or None if no caption """
+        caption = self.cache_caption.get(img)
+        if not self.show_caption or caption is None:
+            return None
+        # Adjust caption size and position.
+        lines_count = caption.count('\n') + 1
+        if lines_count > CFG.CAPTION_MAX_ROWS:
+            caption = '\n'.join(caption.split('\n')[0:CFG.CAPTION_MAX_ROWS])
+            lines_count = CFG.CAPTION_MAX_ROWS
+        max_line_len = max(len(line) for line in caption.split('\n'))
+        caption_height = int(CFG.CAPTION_FONT_SIZE * lines_count)
+        caption_y = int(self.img_h * CFG.CAPTION_Y_POS_PERC) - int(CFG.CAPTION_Y_POS_PERC * caption_height)
+        background_width = int(float(max_line_len) * CFG.CAPTION_FONT_SIZE * CFG.CAPTION_FONT_RATIO_XY)
+        if (float(background_width) / self.img_w) < 0.33:
+            # Compensate width for short captions.
+            background_width = int(float(background_width) * 1.3)
+        if background_width > self.img_w:
+            background_width = self.img_w
+        background_x = (self.img_w - background_width) // 2
+        return (caption, caption_y, caption_height, background_x, background_width)
+
+
+    def applyCaptionLayout(self, layout):
+        """ Update the caption controls with a layout from captionLayout() """
         self.imageCaption.setVisible(self.show_caption)
         self.captionBackground.setVisible(self.show_caption)
-        if not self.show_caption:
+        if layout is None:
             self.imageCaption.setLabel('')
-        else:
-            caption = self.cache_caption[cur_img]
-            if caption is None:
-                self.imageCaption.setLabel('')
-                self.captionBackground.setVisible(False)
-            else:
-                # Adjust caption size and position.
-                lines_count = caption.count('\n') + 1
-                if lines_count > CFG.CAPTION_MAX_ROWS:
-                    caption = '\n'.join(caption.split('\n')[0:CFG.CAPTION_MAX_ROWS])
-                    lines_count = CFG.CAPTION_MAX_ROWS
-                self.imageCaption.setLabel(caption)
-                max_line_len = max(len(line) for line in caption.split('\n'))
-                caption_height = int(CFG.CAPTION_FONT_SIZE * lines_count)
-                caption_y = int(self.img_h * CFG.CAPTION_Y_POS_PERC) - int(CFG.CAPTION_Y_POS_PERC * caption_height)
-                background_width = int(float(max_line_len) * CFG.CAPTION_FONT_SIZE * CFG.CAPTION_FONT_RATIO_XY)
-                if (float(background_width) / self.img_w) < 0.33:
-                    # Compensate width for short captions.
-                    background_width = int(float(background_width) * 1.3)
-                if background_width > self.img_w:
-                    background_width = self.img_w
-                background_x = (self.img_w - background_width) // 2
-                # WARNING: setHeight() does not work after ControlLabel creation.
-                self.imageCaption.setHeight(caption_height)
-                self.imageCaption.setPosition(0, caption_y)
-                self.captionBackground.setPosition(background_x, caption_y)
-                self.captionBackground.setWidth(background_width)
-                self.captionBackground.setHeight(caption_height)
-
-
-    def imageToGeometry(self, img, tmpfile):
+            self.captionBackground.setVisible(False)
+            return
+        caption, caption_y, caption_height, background_x, background_width = layout
+        self.imageCaption.setLabel(caption)
+        # WARNING: setHeight() does not work after ControlLabel creation.
+        self.imageCaption.setHeight(caption_height)
+        self.imageCaption.setPosition(0, caption_y)
+        self.captionBackground.setPosition(background_x, caption_y)
+        self.captionBackground.setWidth(background_width)
+        self.captionBackground.setHeight(caption_height)
+
+
+    def imageToGeometry(self, img, tmpfile, tier=None):
         """ Crop and resize an image, save it into a temporary cache file """
+        draft, resample, quality = self.governor.params(tier)
         try:
             filename = os.path.join(self.directory, self.filename[img])
-            self.myLog('Opening image file "%s"' % (filename,), xbmc.LOGDEBUG)
-            image = Image.open(filename.encode('utf-8')).convert('RGB')
-            exif_tags = get_exif_tags(image)
-            #xbmc.log(msg='Got Exif data = %s' % (exif_tags,), level=xbmc.LOGINFO)
-            exif_orientation_tag = exif_tags['orientation']
+            log.debug('Opening image file "%s"', filename)
+            self.cache_mtime[img] = self.sourceMtime(img)
+            fullscreen_image, exif_tags, invalid_geometry = render_image(
+                filename, self.geometry[img], (self.img_w, self.img_h),
+                draft, resample, CFG.LARGE_IMAGE_PIXELS)
             self.cache_caption[img] = exif_tags['usercomment']
-            if exif_orientation_tag in EXIF_ROTATE.keys():
-                image = image.transpose(EXIF_ROTATE[exif_orientation_tag])
-            self.myLog('Image "%s": Exif orientation tag: "%s"' % (self.filename[img], exif_orientation_tag,), xbmc.LOGINFO)
-            image_w = image.width
-            image_h = image.height
-            match = re.match(GEOMETRY_RE, self.geometry[img])
-            invalid_geometry = False
-            if not match:
-                self.myLog('Invalid geometry for "%s": "%s" (size: %dx%d)' % (self.filename[img], self.geometry[img], image_w, image_h), xbmc.LOGERROR)
-                invalid_geometry = True
-            else:
-                gw = int(match.groups()[0])
-                gh = int(match.groups()[1])
-                gx = int(match.groups()[2])
-                gy = int(match.groups()[3])
-                if gx > image_w:
-                    self.myLog('Invalid geometry for "%s": x-offset %d beyond image width %d' % (self.filename[img], gx, image_w), xbmc.LOGERROR)
-                    invalid_geometry = True
-                if gy > image_h:
-                    self.myLog('Invalid geometry for "%s": y-offset %d beyond image height %d' % (self.filename[img], gy, image_h), xbmc.LOGERROR)
-                    invalid_geometry = True
             if invalid_geometry:
                 heading = __localize__(32012)
                 message = __localize__(32013) % (self.filename[img],)
                 xbmcgui.Dialog().notification(heading, message, xbmcgui.NOTIFICATION_WARNING)
-                fullscreen_image = image.resize((self.img_w, self.img_h), resample=Image.BILINEAR)
-            else:
-                # Fix the geometry to remove small (< 0.7%) black borders.
-                if (gx + gw) > image_w:
-                    excess = (gx + gw) - image_w
-                    excess_perc = (float(gx + gw) / image_w) - 1.0
-                    if excess_perc < 0.007:
-                        self.myLog('Fixing black border X: %s px, %0.2f%%' % (excess, excess_perc * 100), xbmc.LOGINFO)
-                        gx -= excess
-                        if gx < 0:
-                            gw += gx
-                            gx = 0
-                if (gy + gh) > image_h:
-                    excess = (gy + gh) - image_h
-                    excess_perc = (float(gy + gh) / image_h) - 1.0
-                    if excess_perc < 0.007:
-                        self.myLog('Fixing black border Y: %s px, %0.2f%%' % (excess, excess_perc * 100), xbmc.LOGINFO)
-                        gy -= excess
-                        if gy < 0:
-                            gh += gy
-                            gy = 0
-                # Do we need vertical or horizontal black borders?
-                black_x = 0.0
-                black_y = 0.0
-                if (gx + gw) > image_w:
-                    black_x = float((gx + gw) - image_w) / 2.0
-                if (gy + gh) > image_h:
-                    black_y = float((gy + gh) - image_h) / 2.0
-                # Calculate crop and offset.
-                zoom_x = float(self.img_w) / float(gw)
-                zoom_y = float(self.img_h) / float(gh)
-                offset_scaled = (int(black_x * zoom_x), int(black_y * zoom_y))
-                crop_left = gx
-                crop_upper = gy
-                crop_right = gx + gw - int(black_x * 2.0)
-                crop_lower = gy + gh - int(black_y * 2.0)
-                crop_w = crop_right - crop_left
-                crop_h = crop_lower - crop_upper
-                crop_w_scaled = int(crop_w * zoom_x)
-                crop_h_scaled = int(crop_h * zoom_y)
-                image = image.crop((crop_left, crop_upper, crop_right, crop_lower)).resize((crop_w_scaled, crop_h_scaled), resample=Image.BILINEAR)
-                # Paste the image over a black background.
-                fullscreen_image = Image.new('RGB', (self.img_w, self.img_h))
-                fullscreen_image.paste(image, offset_scaled)
-
-            fullscreen_image.save(tmpfile)
-            self.myLog('Full screen image saved as "%s"' % (tmpfile,), xbmc.LOGINFO)
+            fullscreen_image.save(tmpfile, quality=quality)
+            log.info('Full screen image saved as "%s"', tmpfile)
 
         except Exception as e:
 
             self.cache_caption[img] = ''
             # Prepare a fullscreen image with broken image icon.
-            filename = os.path.join(ADDONPATH, BROKEN_PHOTO)
-            image = Image.open(filename.encode('utf-8')).convert('RGB')
-            image_w = image.width
-            image_h = image.height
-            fullscreen_image = Image.new('RGB', (self.img_w, self.img_h))
-            zoom_x = float(self.img_w) / float(image.width)
-            zoom_y = float(self.img_h) / float(image.height)
-            zoom = min(zoom_x, zoom_y)
-            off_x = int((float(self.img_w) - (zoom * image.width)) / 2)
-            off_y = int((float(self.img_h) - (zoom * image.height)) / 2)
-            resize_x = int(image_w * zoom)
-            resize_y = int(image_h * zoom)
-            fullscreen_image.paste(image.resize((resize_x, resize_y), resample=Image.BILINEAR), (off_x, off_y))
+            fullscreen_image = render_broken(os.path.join(ADDONPATH, BROKEN_PHOTO), (self.img_w, self.img_h))
             fullscreen_image.save(tmpfile)
             # Show error dialog.
             heading = __localize__(32014)
             message = __localize__(32015) % (self.filename[img], str(e),)
-            self.myLog(message, xbmc.LOGERROR)
+            log.error(message)
             xbmcgui.Dialog().notification(heading, message, xbmcgui.NOTIFICATION_ERROR)
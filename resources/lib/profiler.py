@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Module to profile the slideshow engine for a limited number of
+slides. Time is measured with cProfile, memory allocations with
+tracemalloc; the results are written into a directory as a .prof
+file (to be inspected with pstats or snakeviz) and a text file with
+the top allocation sites. Allocations are traced from the start of
+the first profiled slide until the last one is done (in all the
+threads), not during the add-on startup. Image buffers allocated by
+Pillow are not seen by tracemalloc, so the peak resident set size of
+the process is also reported after each slide (not available on
+Windows).
+"""
+
+import cProfile
+import os
+import os.path
+import sys
+import tracemalloc
+try:
+    import resource
+except ImportError:
+    # Not available on Windows.
+    resource = None
+
+from resources.lib import log
+
+__author__ = "Niccolo Rigacci"
+__copyright__ = "Copyright 2026 Niccolo Rigacci <niccolo@rigacci.org>"
+__license__ = "GPLv3-or-later"
+__email__ = "niccolo@rigacci.org"
+__version__ = "0.1.0"
+
+# Number of allocation sites to report.
+TOP_ALLOCATIONS = 30
+# Stack depth recorded by tracemalloc for each allocation.
+TRACEBACK_FRAMES = 4
+
+
+class SlideProfiler:
+    """ Profile the engine for the next slides, then write the report """
+
+    def __init__(self, slides, directory, session):
+        self.remaining = slides
+        self.directory = directory
+        self.session = session
+        self.profile = cProfile.Profile()
+        self.peak_rss = []
+        log.info('Profiling the next %d slides', slides)
+
+    def start(self):
+        """ Start measuring; must be called by the same thread as stop() """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_FRAMES)
+        self.profile.enable()
+
+    def stop(self):
+        """ Stop measuring, return True when all the slides are done """
+        self.profile.disable()
+        if resource is not None:
+            self.peak_rss.append(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+        self.remaining -= 1
+        if self.remaining > 0:
+            return False
+        self.write()
+        return True
+
+    def write(self):
+        """ Save the .prof file and the allocation report, stop tracemalloc """
+        if not tracemalloc.is_tracing():
+            log.info('No slides were profiled')
+            return
+        basename = os.path.join(self.directory, 'profile-%s' % (self.session,))
+        try:
+            if not os.path.isdir(self.directory.encode('utf-8')):
+                os.makedirs(self.directory.encode('utf-8'))
+            self.profile.dump_stats(basename + '.prof')
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, cProfile.__file__)))
+            with open((basename + '-alloc.txt').encode('utf-8'), 'w', encoding='utf-8') as f:
+                f.write('Traced memory: current %d KiB, peak %d KiB\n' % (current // 1024, peak // 1024))
+                # ru_maxrss is in bytes on macOS, in KiB elsewhere.
+                scale = 1024 if sys.platform == 'darwin' else 1
+                for i, rss in enumerate(self.peak_rss):
+                    f.write('Peak RSS after slide %d: %d KiB\n' % (i + 1, rss // scale))
+                f.write('\n')
+                for stat in snapshot.statistics('traceback')[0:TOP_ALLOCATIONS]:
+                    f.write('%d KiB in %d blocks\n' % (stat.size // 1024, stat.count))
+                    for line in stat.traceback.format():
+                        f.write('%s\n' % (line,))
+                    f.write('\n')
+            log.info('Profile saved as "%s.prof" and "%s-alloc.txt"', basename, basename)
+        except Exception as e:
+            log.error('Cannot save profile "%s": %s', basename, str(e))
+        tracemalloc.stop()
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Module to render an image at the playlist geometry: the image is
+rotated according to the Exif orientation, cropped and resized to
+fill the screen, with black borders if the geometry exceeds the
+image. It does not depend on Kodi, so that the output can be
+verified against the golden corpus (see golden.py).
+"""
+
+from PIL import Image
+import re
+
+from resources.lib import log
+from resources.lib.exif import get_exif_tags
+from resources.lib.largeimage import load_region, needs_bounded_load, EXIF_ROTATE, EXIF_SWAP_XY
+
+__author__ = "Niccolo Rigacci"
+__copyright__ = "Copyright 2019-2026 Niccolo Rigacci <niccolo@rigacci.org>"
+__license__ = "GPLv3-or-later"
+__email__ = "niccolo@rigacci.org"
+__version__ = "0.1.0"
+
+GEOMETRY_RE = r'(\d+)x(\d+)\+(\d+)\+(\d+)'
+
+# Black borders smaller than this (fraction of image size) are removed.
+BLACK_BORDER_FIX = 0.007
+
+
+def draft_image(image, geometry, orientation, size):
+    """ Let the JPEG decoder downscale while loading, return the (x, y) scale in rotated coordinates """
+    src_w, src_h = image.size
+    if orientation in EXIF_SWAP_XY:
+        rot_w, rot_h = src_h, src_w
+    else:
+        rot_w, rot_h = src_w, src_h
+    match = re.match(GEOMETRY_RE, geometry)
+    if match:
+        rot_w = int(match.groups()[0])
+        rot_h = int(match.groups()[1])
+    # The cropped region must still be bigger than the screen.
+    scale = min(float(rot_w) / size[0], float(rot_h) / size[1])
+    if scale < 2.0:
+        return (1.0, 1.0)
+    image.draft('RGB', (int(src_w / scale) + 1, int(src_h / scale) + 1))
+    ratio_w = float(image.width) / src_w
+    ratio_h = float(image.height) / src_h
+    log.debug('Draft decoding at %dx%d', image.width, image.height)
+    if orientation in EXIF_SWAP_XY:
+        return (ratio_h, ratio_w)
+    return (ratio_w, ratio_h)
+
+
+def render_image(filename, geometry, size, draft=False, resample=Image.BILINEAR, max_pixels=None):
+    """
+    Return (fullscreen_image, exif_tags, invalid_geometry) for the image
+    file cropped at geometry and resized to size. Images bigger than
+    max_pixels are loaded with bounded memory (see largeimage.py).
+    Exceptions are raised for unreadable files.
+    """
+    screen_w, screen_h = size
+    image = Image.open(filename.encode('utf-8'))
+    exif_tags = get_exif_tags(image)
+    exif_orientation_tag = exif_tags['orientation']
+    # Very large or high bit-depth images are read in bands, only
+    # the region to be displayed is decoded (see load_region()).
+    large_image = max_pixels is not None and needs_bounded_load(image, max_pixels)
+    if large_image:
+        log.info('Image "%s": %dx%d %s, using bounded memory loading', filename, image.width, image.height, image.mode)
+        if exif_orientation_tag in EXIF_SWAP_XY:
+            image_w, image_h = image.height, image.width
+        else:
+            image_w, image_h = image.width, image.height
+        image.close()
+    else:
+        draft_x, draft_y = (1.0, 1.0)
+        if draft and image.format == 'JPEG':
+            draft_x, draft_y = draft_image(image, geometry, exif_orientation_tag, size)
+        image = image.convert('RGB')
+        if exif_orientation_tag in EXIF_ROTATE.keys():
+            image = image.transpose(EXIF_ROTATE[exif_orientation_tag])
+        image_w = image.width
+        image_h = image.height
+    log.info('Image "%s": Exif orientation tag: "%s"', filename, exif_orientation_tag)
+    match = re.match(GEOMETRY_RE, geometry)
+    invalid_geometry = False
+    if not match:
+        log.error('Invalid geometry for "%s": "%s" (size: %dx%d)', filename, geometry, image_w, image_h)
+        invalid_geometry = True
+    else:
+        gw = int(match.groups()[0])
+        gh = int(match.groups()[1])
+        gx = int(match.groups()[2])
+        gy = int(match.groups()[3])
+        if not large_image and (draft_x, draft_y) != (1.0, 1.0):
+            # Geometry refers to the full size image.
+            gw = int(round(gw * draft_x))
+            gh = int(round(gh * draft_y))
+            gx = int(round(gx * draft_x))
+            gy = int(round(gy * draft_y))
+        if gx > image_w:
+            log.error('Invalid geometry for "%s": x-offset %d beyond image width %d', filename, gx, image_w)
+            invalid_geometry = True
+        if gy > image_h:
+            log.error('Invalid geometry for "%s": y-offset %d beyond image height %d', filename, gy, image_h)
+            invalid_geometry = True
+    if invalid_geometry:
+        if large_image:
+            fullscreen_image = load_region(filename.encode('utf-8'), (0, 0, image_w, image_h), exif_orientation_tag, size, max_pixels, resample)
+        else:
+            fullscreen_image = image.resize(size, resample=resample)
+        return (fullscreen_image, exif_tags, invalid_geometry)
+    # Fix the geometry to remove small (< 0.7%) black borders.
+    if (gx + gw) > image_w:
+        excess = (gx + gw) - image_w
+        excess_perc = (float(gx + gw) / image_w) - 1.0
+        if excess_perc < BLACK_BORDER_FIX:
+            log.info('Fixing black border X: %s px, %0.2f%%', excess, excess_perc * 100)
+            gx -= excess
+            if gx < 0:
+                gw += gx
+                gx = 0
+    if (gy + gh) > image_h:
+        excess = (gy + gh) - image_h
+        excess_perc = (float(gy + gh) / image_h) - 1.0
+        if excess_perc < BLACK_BORDER_FIX:
+            log.info('Fixing black border Y: %s px, %0.2f%%', excess, excess_perc * 100)
+            gy -= excess
+            if gy < 0:
+                gh += gy
+                gy = 0
+    # Do we need vertical or horizontal black borders?
+    black_x = 0.0
+    black_y = 0.0
+    if (gx + gw) > image_w:
+        black_x = float((gx + gw) - image_w) / 2.0
+    if (gy + gh) > image_h:
+        black_y = float((gy + gh) - image_h) / 2.0
+    # Calculate crop and offset.
+    zoom_x = float(screen_w) / float(gw)
+    zoom_y = float(screen_h) / float(gh)
+    offset_scaled = (int(black_x * zoom_x), int(black_y * zoom_y))
+    crop_left = gx
+    crop_upper = gy
+    crop_right = gx + gw - int(black_x * 2.0)
+    crop_lower = gy + gh - int(black_y * 2.0)
+    crop_w = crop_right - crop_left
+    crop_h = crop_lower - crop_upper
+    crop_w_scaled = int(crop_w * zoom_x)
+    crop_h_scaled = int(crop_h * zoom_y)
+    if large_image:
+        image = load_region(filename.encode('utf-8'), (crop_left, crop_upper, crop_right, crop_lower), exif_orientation_tag, (crop_w_scaled, crop_h_scaled), max_pixels, resample)
+    else:
+        image = image.crop((crop_left, crop_upper, crop_right, crop_lower)).resize((crop_w_scaled, crop_h_scaled), resample=resample)
+    # Paste the image over a black background.
+    fullscreen_image = Image.new('RGB', (screen_w, screen_h))
+    fullscreen_image.paste(image, offset_scaled)
+    return (fullscreen_image, exif_tags, invalid_geometry)
+
+
+def render_broken(filename, size):
+    """ Return a fullscreen image with the broken image icon from filename """
+    screen_w, screen_h = size
+    image = Image.open(filename.encode('utf-8')).convert('RGB')
+    image_w = image.width
+    image_h = image.height
+    fullscreen_image = Image.new('RGB', (screen_w, screen_h))
+    zoom_x = float(screen_w) / float(image.width)
+    zoom_y = float(screen_h) / float(image.height)
+    zoom = min(zoom_x, zoom_y)
+    off_x = int((float(screen_w) - (zoom * image.width)) / 2)
+    off_y = int((float(screen_h) - (zoom * image.height)) / 2)
+    resize_x = int(image_w * zoom)
+    resize_y = int(image_h * zoom)
+    fullscreen_image.paste(image.resize((resize_x, resize_y), resample=Image.BILINEAR), (off_x, off_y))
+    return fullscreen_image
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 
-import xbmc
-import xbmcvfs
+from resources.lib import log
 from xml.dom.minidom import parseString
 
 __author__ = "Niccolo Rigacci"
@@ -18,6 +17,7 @@ def get_preferred_font(preferred_name='', preferred_size=36, required_style=''):
     # The font with the closest size to preferred_size is selected.
     selected_font = 'font13'  # Default font every skin must have.
     selected_size = 24
+    import xbmcvfs
     skin_font = xbmcvfs.File('special://skin/xml/Font.xml', 'r')
     #skin_font = open('/usr/share/kodi/addons/skin.estuary/xml/Font.xml', 'r')
     font_xml = skin_font.read()
@@ -51,5 +51,5 @@ def get_preferred_font(preferred_name='', preferred_size=36, required_style=''):
             min_diff = diff_size
             selected_font = font_tag['name']
             selected_size = int(font_tag['size'])
-    xbmc.log(msg='Selected font: %s, size: %s' % (selected_font, selected_size,), level=xbmc.LOGINFO)
+    log.info('Selected font: %s, size: %s', selected_font, selected_size)
     return (selected_font, selected_size)